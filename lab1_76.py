@@ -1,72 +1,141 @@
+import gzip
+import os
+import re
+import sys
+import time
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import requests
-from io import StringIO
 
 url = "https://raw.githubusercontent.com/dm-fedorov/python_basic/master/data/opendata.stat"
-df = pd.read_csv(StringIO(requests.get(url).text))
+cache_path = "opendata.csv.gz"
+cache_ttl = 24 * 60 * 60  # Время жизни кэша, секунд
+make_plot = True  # False - только вывести среднее, без построения графика
+show_plot = '--no-show' not in sys.argv  # --no-show - только сохранить график в файл
+max_annotations = 30  # При большем числе точек подписи все равно накладываются
+
 
+def load_data(url, cache=cache_path):
+    # Скачиваем данные, только если кэша нет или он устарел
+    if not os.path.exists(cache) or time.time() - os.path.getmtime(cache) > cache_ttl:
+        response = requests.get(url)
+        response.raise_for_status()
+        # Пишем во временный файл и подменяем кэш целиком, чтобы прерванная
+        # запись не оставила обрезанный архив со свежей датой изменения
+        tmp_path = cache + '.tmp'
+        try:
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, cache)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    # pandas сам распакует gzip по расширению файла;
+    # типы столбцов задаем сразу, чтобы не преобразовывать их после чтения
+    data = pd.read_csv(cache,
+                       parse_dates=['date'],
+                       dtype={'region': 'category', 'name': 'category'},
+                       low_memory=False)
+    # Нечисловые значения превращаем в NaN; если столбец уже числовой, копии не будет
+    data['value'] = pd.to_numeric(data['value'], errors='coerce')
+    return data
 
-df['date'] = pd.to_datetime(df['date'])
-df['year'] = df['date'].dt.year
-df['month'] = df['date'].dt.month
 
-pension_keywords = ['пенси', 'пенс', 'пенсион', 'pension', 'выплат пенс']
-mask_region = df['region'] == 'Забайкальский край'
-mask_year = df['year'] == 2018
+df = load_data(url)
 
-filtered = df[mask_region & mask_year].copy()
+# 'пенс' покрывает и 'пенси', 'пенсион', 'выплат пенс'
+pension_keywords = ['пенс', 'pension']
+pension_pattern = '|'.join(map(re.escape, pension_keywords))
 
-pension_mask = filtered['name'].str.contains('|'.join(pension_keywords), case=False, na=False)
+# Отбираем регион и год одной маской, без промежуточных столбцов и копии
+mask = np.logical_and((df['region'] == 'Забайкальский край').to_numpy(),
+                      (df['date'].dt.year == 2018).to_numpy())
+filtered = df.loc[mask]
+
+# Ищем ключевые слова только среди категорий столбца name,
+# а строки отбираем по целочисленным кодам категорий
+names = filtered['name']
+pension_codes = np.flatnonzero(
+    names.cat.categories.str.contains(pension_pattern, case=False, regex=True, na=False))
+pension_mask = np.isin(names.cat.codes.to_numpy(), pension_codes)
 
 if pension_mask.any():
-    pension_data = filtered[pension_mask].copy()
-    
-    pension_data['value'] = pd.to_numeric(pension_data['value'], errors='coerce')
-    
-    daily_pension = pension_data.groupby('date')['value'].mean().reset_index()
-    daily_pension = daily_pension.sort_values('date')
-    
-    # Вычисляем общее среднее значение
-    overall_avg = daily_pension['value'].mean()
+    pension_data = filtered[pension_mask]
+    
+    # Сортируем записи по дате один раз (устойчивой сортировкой) и считаем
+    # средние по отрезкам с одинаковой датой через np.add.reduceat
+    dates = pension_data['date'].to_numpy()
+    order = np.argsort(dates, kind='mergesort')
+    dates = dates[order]
+    values = pension_data['value'].to_numpy()[order]
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    is_valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(is_valid, values, 0.0), starts)
+    counts = np.add.reduceat(is_valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore'):
+        daily_values = sums / counts
+    # Дальше работаем с массивами NumPy напрямую, без промежуточного DataFrame
+    daily_dates = dates[starts]
+    
+    # Вычисляем общее среднее значение как среднее по датам одной редукцией NumPy;
+    # если значений нет совсем, результат - nan, как у Series.mean()
+    if (~np.isnan(daily_values)).any():
+        overall_avg = float(np.nanmean(daily_values))
+    else:
+        overall_avg = float('nan')
     
     print(f"ОБЩЕЕ СРЕДНЕЕ ЗНАЧЕНИЕ ПЕНСИИ ЗА 2018 ГОД: {overall_avg:.2f}")
     print()
     
-    plt.figure(figsize=(14, 8))
-    
-    plt.plot(daily_pension['date'], daily_pension['value'], 
-             marker='o', linestyle='-', linewidth=2, markersize=8,
-             color='darkblue', alpha=0.8, label='Средняя пенсия по дате')
+    if make_plot:
+        # matplotlib импортируем только когда график действительно строится
+        import matplotlib
+        if not show_plot:
+            # Окно не показываем, поэтому GUI-бэкенд не нужен
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
+        # Упрощаем линии графика, отбрасывая отрезки меньше пикселя
+        plt.rcParams['path.simplify_threshold'] = 1.0
+        
+        plt.figure(figsize=(14, 8))
+        
+        plt.plot(daily_dates, daily_values, 
+                 marker='o', linestyle='-', linewidth=2, markersize=8,
+                 color='darkblue', alpha=0.8, label='Средняя пенсия по дате')
 
-    plt.axhline(y=overall_avg, color='red', linestyle='--', linewidth=2,
-                alpha=0.7, label=f'Общее среднее: {overall_avg:.2f}')
-    
-    plt.title('Изменение среднего значения пенсии в Забайкальском крае, 2018 год',
-              fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Дата', fontsize=12)
-    plt.ylabel('Среднее значение пенсии', fontsize=12)
-    
-    plt.grid(True, alpha=0.3, linestyle='--')
-    
-    plt.legend(fontsize=11)
-    
-    plt.gcf().autofmt_xdate()
-    
-    for i, (date, value) in enumerate(zip(daily_pension['date'], daily_pension['value'])):
-        plt.annotate(f'{value:.1f}', 
-                     xy=(date, value), 
-                     xytext=(0, 10),
-                     textcoords='offset points',
-                     ha='center',
-                     fontsize=9,
-                     color='darkblue')
-    
-    plt.tight_layout()
-    
-    plt.savefig('pension_trend_2018.png', dpi=150, bbox_inches='tight')
- 
-    plt.show()
+        plt.axhline(y=overall_avg, color='red', linestyle='--', linewidth=2,
+                    alpha=0.7, label=f'Общее среднее: {overall_avg:.2f}')
+        
+        plt.title('Изменение среднего значения пенсии в Забайкальском крае, 2018 год',
+                  fontsize=16, fontweight='bold', pad=20)
+        plt.xlabel('Дата', fontsize=12)
+        plt.ylabel('Среднее значение пенсии', fontsize=12)
+        
+        plt.grid(True, alpha=0.3, linestyle='--')
+        
+        plt.legend(fontsize=11)
+        
+        plt.gcf().autofmt_xdate()
+        
+        if len(daily_dates) <= max_annotations:
+            ax = plt.gca()
+            for date, value in zip(daily_dates, daily_values):
+                ax.annotate(f'{value:.1f}', 
+                            xy=(date, value), 
+                            xytext=(0, 10),
+                            textcoords='offset points',
+                            ha='center',
+                            fontsize=9,
+                            color='darkblue')
+        
+        plt.tight_layout()
+        
+        plt.savefig('pension_trend_2018.png', dpi=150)
+        
+        if show_plot:
+            plt.show()
     
 else:
     print("=" * 70)
@@ -3,6 +3,61 @@ import urllib.request
 import urllib.error
 import os
 import socket
+from html.parser import HTMLParser
+
+import requests
+from charset_normalizer import from_bytes
+
+
+# Общая сессия: соединения с одним и тем же хостом переиспользуются между запросами
+_SESSION = requests.Session()
+_SESSION.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Ссылки вида url(...) в CSS: ищутся только внутри <style> и атрибутов style
+_CSS_URL_RE = re.compile(r'url\(["\']?(https?://[^"\')]+)["\']?\)', re.IGNORECASE)
+
+# Размер блока при сохранении страницы в файл
+_CHUNK_SIZE = 64 * 1024
+
+# Кодировка в заголовке Content-Type и в <meta charset> внутри HTML
+_CHARSET_RE = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# Кодировки, из которых выбираем, если страница не в utf-8 и кодировка не указана
+_FALLBACK_ENCODINGS = ['cp1251', 'koi8_r', 'latin_1']
+
+
+# Собирает абсолютные http(s)-ссылки из атрибутов href/src и url(...) в CSS
+class _UrlCollector(HTMLParser):
+    
+    def __init__(self):
+        
+        super().__init__()
+        self.urls = set()
+        self._in_style = False
+    
+    def handle_starttag(self, tag, attrs):
+        
+        self._in_style = tag == 'style'
+        for name, value in attrs:
+            if not value:
+                continue
+            if name in ('href', 'src'):
+                value = value.strip()
+                if value.lower().startswith(('http://', 'https://')):
+                    self.urls.add(value)
+            elif name == 'style':
+                self.urls.update(_CSS_URL_RE.findall(value))
+    
+    def handle_endtag(self, tag):
+        
+        if tag == 'style':
+            self._in_style = False
+    
+    def handle_data(self, data):
+        
+        if self._in_style:
+            self.urls.update(_CSS_URL_RE.findall(data))
 
 
 class MyFile:
@@ -33,8 +88,12 @@ class MyFile:
     
     def _is_url(self, path: str) -> bool:
        
-        url_patterns = ["http://", "https://", "ftp://", "file://"]
-        return any(path.startswith(pattern) for pattern in url_patterns)
+        return path.startswith(("http://", "https://", "ftp://", "file://"))
+    
+    def _is_http_url(self, url: str) -> bool:
+        
+        # requests работает только с http(s); ftp:// и file:// открываем через urllib
+        return url.startswith(("http://", "https://"))
     
     def _file_exists(self, filepath: str) -> bool:
     
@@ -45,74 +104,124 @@ class MyFile:
     
     def _check_url_availability(self, url: str, timeout: int = 5) -> bool:
         
+        if not self._is_http_url(url):
+            try:
+                # Для ftp:// и file:// код ответа не возвращается - достаточно открыть URL
+                with urllib.request.urlopen(url, timeout=timeout):
+                    return True
+            except (urllib.error.URLError, socket.timeout, TimeoutError):
+                return False
+            except Exception:
+                return False
+        
         try:
-            # Устанавливаем заголовки
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            req = urllib.request.Request(url, headers=headers)
+            # HEAD-запрос не скачивает тело страницы
+            response = _SESSION.head(url, timeout=timeout, allow_redirects=True)
             
-            # Открываем URL с таймаутом
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                return response.getcode() == 200
+            # Проверяем, что это не ошибка 404 (страница не найдена);
+            # для других HTTP ошибок считаем URL доступным (но с ошибкой)
+            return response.status_code != 404
                 
-        except urllib.error.HTTPError as e:
-            # Проверяем, что это не ошибка 404 (страница не найдена)
-            if e.code == 404:
-                return False
-            # Для других HTTP ошибок считаем URL доступным (но с ошибкой)
-            return True
-        except (urllib.error.URLError, socket.timeout, TimeoutError):
+        except requests.RequestException:
             return False
         except Exception:
             return False
     
-    def _check_file_access(self, filepath: str, mode: str) -> bool:
-
+    def _open_for_writing(self, filepath: str, mode: str, encoding: str = 'utf-8'):
+        
         try:
-            # Для режима записи/добавления проверяем доступность директории
-            if mode in ['w', 'a']:
-                dir_path = os.path.dirname(filepath)
-                if dir_path and not os.path.exists(dir_path):
-                    # Пытаемся создать директорию
-                    try:
-                        os.makedirs(dir_path, exist_ok=True)
-                    except:
-                        return False
-                
-                # Проверяем права на запись
-                if os.path.exists(filepath):
-                    return os.access(filepath, os.W_OK)
-                else:
-                    # Для нового файла проверяем права на запись в директорию
-                    dir_path = os.path.dirname(filepath) or '.'
-                    return os.access(dir_path, os.W_OK)
-            
-            # Для режима чтения проверяем права на чтение
-            elif mode == 'r':
-                return os.access(filepath, os.R_OK)
-                
-            return True
-        except:
-            return False
+            return open(filepath, mode, encoding=encoding)
+        except FileNotFoundError:
+            # Директории нет - пытаемся создать ее и открыть файл еще раз
+            dir_path = os.path.dirname(filepath)
+            if not dir_path:
+                raise
+            os.makedirs(dir_path, exist_ok=True)
+            return open(filepath, mode, encoding=encoding)
     
     def _open_file(self):
         
+        # Не проверяем файл заранее: open() сам сообщит об отсутствии файла или прав
         if self.mode == "read":
-            if not self._file_exists(self.path):
+            try:
+                self.file = open(self.path, 'r', encoding='utf-8')
+            except (FileNotFoundError, IsADirectoryError):
                 raise FileNotFoundError(f"Файл '{self.path}' не существует")
-            if not self._check_file_access(self.path, 'r'):
+            except PermissionError:
                 raise PermissionError(f"Нет прав на чтение файла '{self.path}'")
-            self.file = open(self.path, 'r', encoding='utf-8')
         elif self.mode == "write":
-            if not self._check_file_access(self.path, 'w'):
+            try:
+                self.file = self._open_for_writing(self.path, 'w')
+            except PermissionError:
                 raise PermissionError(f"Нет прав на запись в файл '{self.path}'")
-            self.file = open(self.path, 'w', encoding='utf-8')
         elif self.mode == "append":
-            if not self._check_file_access(self.path, 'a'):
+            try:
+                self.file = self._open_for_writing(self.path, 'a')
+            except PermissionError:
                 raise PermissionError(f"Нет прав на добавление в файл '{self.path}'")
-            self.file = open(self.path, 'a', encoding='utf-8')
+    
+    def _check_response_status(self, response):
+        
+        if response.status_code == 404:
+            raise ConnectionError(f"Страница '{self.path}' не найдена (404)")
+        if response.status_code >= 400:
+            raise ConnectionError(f"HTTP ошибка {response.status_code}: {response.reason} для URL '{self.path}'")
+        if response.status_code != 200:
+            raise ConnectionError(f"URL вернул статус {response.status_code}")
+    
+    def _decode_content(self, content: bytes, content_type: str) -> str:
+        
+        # Сначала берем кодировку из заголовка, затем из <meta> в первых 4 КБ страницы
+        encoding = None
+        match = _CHARSET_RE.search(content_type or '')
+        if match:
+            encoding = match.group(1)
+        else:
+            match = _META_CHARSET_RE.search(content[:4096])
+            if match:
+                encoding = match.group(1).decode('ascii')
+        
+        if encoding:
+            try:
+                return content.decode(encoding, errors='replace')
+            except LookupError:
+                # Неизвестное имя кодировки - определяем по содержимому
+                pass
+        
+        # Большинство страниц в utf-8 - проверяем ее первой
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+        
+        # Иначе определяем кодировку по содержимому, выбирая из тех же кодировок,
+        # что и раньше: без ограничения короткий русский текст принимается за CJK
+        best = from_bytes(content, cp_isolation=_FALLBACK_ENCODINGS).best()
+        if best is not None:
+            return str(best)
+        
+        return content.decode(_FALLBACK_ENCODINGS[0], errors='replace')
+    
+    def _save_chunks(self, chunks, filepath: str):
+        
+        # Пишем во временный файл рядом с целевым и подменяем его только после
+        # успешной загрузки, чтобы обрыв связи не оставил обрезанный файл
+        tmp_path = filepath + '.part'
+        try:
+            f = self._open_for_writing(tmp_path, 'wb', encoding=None)
+        except PermissionError:
+            raise PermissionError(f"Нет прав на запись в файл '{filepath}'")
+        try:
+            # Пишем байты страницы блоками по 64 КБ, без декодирования в str
+            with f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, filepath)
+        except PermissionError:
+            raise PermissionError(f"Нет прав на запись в файл '{filepath}'")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def _close_file(self):
         
@@ -124,10 +233,6 @@ class MyFile:
         if self.mode != "read":
             raise ValueError(f"Метод read() доступен только в режиме 'read', текущий режим: '{self.mode}'")
         
-        # Проверяем существование файла перед открытием
-        if not self._file_exists(self.path):
-            raise FileNotFoundError(f"Файл '{self.path}' не существует")
-        
         try:
             self._open_file()
             return self.file.read()
@@ -145,11 +250,6 @@ class MyFile:
         if self.mode not in ["write", "append"]:
             raise ValueError(f"Метод write() доступен только в режимах 'write' или 'append', текущий режим: '{self.mode}'")
         
-        # Проверяем доступ к файлу перед открытием
-        mode_char = 'w' if self.mode == "write" else 'a'
-        if not self._check_file_access(self.path, mode_char):
-            raise PermissionError(f"Нет прав на запись в файл '{self.path}'")
-        
         try:
             self._open_file()
             self.file.write(content)
@@ -166,47 +266,25 @@ class MyFile:
         if self.mode != "url":
             raise ValueError(f"Метод read_url() доступен только в режиме 'url', текущий режим: '{self.mode}'")
         
-        # Проверяем доступность URL перед запросом
-        if not self._check_url_availability(self.path):
-            raise ConnectionError(f"URL '{self.path}' недоступен или не существует")
-        
         try:
-            # Устанавливаем заголовки, чтобы не блокировали как бота
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            req = urllib.request.Request(self.path, headers=headers)
-            
-            with urllib.request.urlopen(req, timeout=10) as response:
-                # Проверяем статус ответа
-                if response.getcode() != 200:
-                    raise ConnectionError(f"URL вернул статус {response.getcode()}")
-                
-                # Пытаемся определить кодировку
-                content = response.read()
-                
-                # Пробуем разные кодировки
-                encodings = ['utf-8', 'cp1251', 'koi8-r', 'iso-8859-1']
+            if self._is_http_url(self.path):
+                response = _SESSION.get(self.path, timeout=10)
                 
-                for encoding in encodings:
-                    try:
-                        return content.decode(encoding)
-                    except UnicodeDecodeError:
-                        continue
+                # Проверяем статус ответа
+                self._check_response_status(response)
                 
-                # Если ни одна кодировка не подошла, возвращаем как utf-8 с заменой ошибок
-                return content.decode('utf-8', errors='replace')
+                return self._decode_content(response.content, response.headers.get('Content-Type', ''))
+            
+            # ftp:// и file:// requests не поддерживает - читаем через urllib
+            with urllib.request.urlopen(self.path, timeout=10) as response:
+                return self._decode_content(response.read(), response.headers.get('Content-Type', ''))
                 
-        except urllib.error.HTTPError as e:
-            if e.code == 404:
-                raise ConnectionError(f"Страница '{self.path}' не найдена (404)")
-            else:
-                raise ConnectionError(f"HTTP ошибка {e.code}: {e.reason} для URL '{self.path}'")
+        except (requests.Timeout, TimeoutError):
+            raise ConnectionError(f"Таймаут при загрузке URL '{self.path}'")
+        except requests.RequestException as e:
+            raise ConnectionError(f"Ошибка URL '{self.path}': {e}")
         except urllib.error.URLError as e:
             raise ConnectionError(f"Ошибка URL '{self.path}': {e.reason}")
-        except TimeoutError:
-            raise ConnectionError(f"Таймаут при загрузке URL '{self.path}'")
         except ConnectionError as e:
             raise e
         except Exception as e:
@@ -220,24 +298,12 @@ class MyFile:
         try:
             html_content = self.read_url()
             
-            # Регулярное выражение для поиска URL в HTML
-            url_patterns = [
-                r'href=["\'](https?://[^"\']+)["\']',
-                r'src=["\'](https?://[^"\']+)["\']',
-                r'url\(["\']?(https?://[^"\')]+)["\']?\)',
-            ]
-            
-            urls = set()
+            # Разбираем HTML парсером вместо поиска регулярными выражениями по всей странице
+            collector = _UrlCollector()
+            collector.feed(html_content)
+            collector.close()
             
-            for pattern in url_patterns:
-                found_urls = re.findall(pattern, html_content, re.IGNORECASE)
-                urls.update(found_urls)
-            
-            general_pattern = r'https?://[^\s<>"\']+'
-            general_urls = re.findall(general_pattern, html_content, re.IGNORECASE)
-            urls.update(general_urls)
-            
-            return len(urls)
+            return len(collector.urls)
             
         except ConnectionError as e:
             print(f"Ошибка: {e}")
@@ -251,28 +317,26 @@ class MyFile:
         if self.mode != "url":
             raise ValueError(f"Метод write_url() доступен только в режиме 'url', текущий режим: '{self.mode}'")
         
-        # Проверяем, что можем создать файл для записи
-        if os.path.exists(filepath):
-            if not self._check_file_access(filepath, 'w'):
-                raise PermissionError(f"Нет прав на запись в файл '{filepath}'")
-        else:
-            dir_path = os.path.dirname(filepath) or '.'
-            if not os.access(dir_path, os.W_OK):
-                raise PermissionError(f"Нет прав на создание файла в директории '{dir_path}'")
-        
         try:
-            # Читаем содержимое URL
-            content = self.read_url()
-            
-            # Создаем объект для записи в файл
-            file_writer = MyFile(filepath, "write")
-            success = file_writer.write(content)
-            
-            if success:
-                print(f"Содержимое URL успешно сохранено в файл: {filepath}")
+            # Один запрос: тело ответа потоком пишется прямо в файл, без чтения в память
+            if self._is_http_url(self.path):
+                with _SESSION.get(self.path, stream=True, timeout=10) as response:
+                    self._check_response_status(response)
+                    # iter_content сам распаковывает сжатый (gzip/deflate) ответ
+                    self._save_chunks(response.iter_content(chunk_size=_CHUNK_SIZE), filepath)
+            else:
+                with urllib.request.urlopen(self.path, timeout=10) as response:
+                    self._save_chunks(iter(lambda: response.read(_CHUNK_SIZE), b''), filepath)
             
-            return success
+            print(f"Содержимое URL успешно сохранено в файл: {filepath}")
+            return True
             
+        except (requests.Timeout, TimeoutError):
+            raise ConnectionError(f"Таймаут при загрузке URL '{self.path}'")
+        except requests.RequestException as e:
+            raise ConnectionError(f"Ошибка URL '{self.path}': {e}")
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Ошибка URL '{self.path}': {e.reason}")
         except (ConnectionError, PermissionError) as e:
             raise e
         except Exception as e:
@@ -291,10 +355,6 @@ class MyFile:
     
     def __repr__(self):
         return f"MyFile(path='{self.path}', mode='{self.mode}')"
-    
-    def __del__(self):
-        
-        self._close_file()
 
 
 def display_menu():
@@ -415,17 +475,19 @@ def url_operations():
         # Проверяем доступность URL перед созданием объекта
         print("Проверяем доступность URL...")
         
-        # Создаем временный объект для проверки
+        # Проверяем HEAD-запросом, тело страницы не скачивается
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=5) as response:
-                if response.getcode() == 200:
-                    print("URL доступен")
-                else:
-                    print(f" URL вернул статус {response.getcode()}")
+            response = _SESSION.head(url, timeout=5, allow_redirects=True)
+            if response.status_code >= 400:
+                # Некоторые серверы отклоняют HEAD (403, 405, 501...), хотя GET работает -
+                # перепроверяем GET, не читая тело страницы
+                with _SESSION.get(url, stream=True, timeout=5) as response:
+                    pass
+            response.raise_for_status()
+            if response.status_code == 200:
+                print("URL доступен")
+            else:
+                print(f" URL вернул статус {response.status_code}")
         except Exception as e:
             print(f" URL может быть недоступен: {e}")
             proceed = input("Продолжить? (y/N): ").strip().lower()